@@ -4,14 +4,511 @@ Impliments routing converters and fiters in Flask to obscure sequential
 integer IDs.  This is base on the 'Obscure' python module.
 
 Once installed, the following converters and filters are available:
-    num, hex, b32, b64, and tame
+    num, hex, b32, b64, tame, and tamec
 """
 
-from werkzeug.routing import BaseConverter, IntegerConverter
+import base64
+import binascii
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import warnings
+from array import array
+from itertools import islice
+from timeit import default_timer as _timer
 from obscure import Obscure as _mod_Obscure, _base32_custom as _tame_alphabet
 
 
 __version__ = "0.1.3"
+__all__ = [
+    "Obscure", "Permutation", "RedisCache", "backends", "save_table",
+    # Defined on first use, importing werkzeug, see __getattr__
+    "Num", "Hex", "Base32", "Base64", "Tame", "TameCheck", "converters",
+]
+
+# Fixed width formats: (width, encoder, decoder)
+_fixed_width = {
+    "hex": (8, "encode_hex", "decode_hex"),
+    "b32": (7, "encode_base32", "decode_base32"),
+    "b64": (6, "encode_base64", "decode_base64"),
+    "tame": (7, "encode_tame", "decode_tame"),
+    "tamec": (8, "encode_tame_check", "decode_tame_check"),
+}
+
+# Encoder for each converter name
+_encoders = {"num": "transform"}
+_encoders.update((name, fmt[1]) for name, fmt in _fixed_width.items())
+
+# Cursor: obscured number and 16-bit page size in url-safe base64
+_cursor = struct.Struct(">IH")
+_cursor_regex = re.compile(r"[-_A-Za-z0-9]{8}\Z")
+
+# Luhn mod 32 over the tame alphabet, doubling every other code
+# from the right.  Doubling is a permutation, halving its inverse.
+# The 7th tame character only holds the last 2 bits of 32, so its code
+# is a multiple of 8 in any ID encode_tame can produce.
+_tame_codes = dict((char, code) for code, char in enumerate(_tame_alphabet))
+_luhn_double = [2 * code // 32 + 2 * code % 32 for code in range(32)]
+_luhn_halve = [_luhn_double.index(code) for code in range(32)]
+
+
+# Backend methods, bound directly on instances without a cache
+_codec_methods = (
+    "transform", "restore", "encode_hex", "decode_hex", "encode_base32",
+    "decode_base32", "encode_base64", "decode_base64", "encode_tame",
+    "decode_tame",
+)
+_cached_methods = (
+    "transform", "encode_hex", "encode_base32", "encode_base64", "encode_tame",
+)
+
+
+def _cached(name):
+    """Wrap the backend method ``name`` to use the instance cache.
+
+    Instances with a cache use this for every call.  Without one
+    :meth:`Obscure._bind` puts the backend's method on the instance
+    instead, so the wrapper only computes the value, for methods looked
+    up before the backend was configured.
+
+    Args:
+      name (string): method name of :class:`obscure.Obscure`
+
+    Returns:
+      function: method looking up ``(backend, salt, name, value)`` in
+        ``self.cache`` before computing it
+    """
+    method = getattr(_mod_Obscure, name)
+
+    def wrapper(self, value):
+        backend, salt, cipher = self._state
+        cache = self._cache
+        if cache is None:
+            return getattr(cipher, name)(value)
+        key = (backend, salt, name, value)
+        try:
+            return cache[key]
+        except KeyError:
+            result = cache[key] = getattr(cipher, name)(value)
+            return result
+
+    wrapper.__name__ = name
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+def _delegate(name):
+    """Forward the method ``name`` to the backend."""
+    method = getattr(_mod_Obscure, name)
+
+    def wrapper(self, value):
+        return getattr(self._state[2], name)(value)
+
+    wrapper.__name__ = name
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+def _check_range(value):
+    if not 0 <= value <= 0xFFFFFFFF:
+        raise ValueError("number must be from 0 to 0xFFFFFFFF, not %r"
+                         % (value,))
+
+
+class _Feistel(_mod_Obscure):
+    """The Feistel cipher of the ``obscure`` module, its own inverse.
+
+    Like :class:`Permutation`, rejects numbers outside of 0 to
+    0xFFFFFFFF, which the module would silently truncate.
+    """
+
+    def transform(self, value):
+        _check_range(value)
+        return _mod_Obscure.transform(self, value)
+
+    restore = transform
+
+
+class Permutation(object):
+    """Base class for backends permuting 32-bit integers.
+
+    Subclasses implement ``forward`` and its inverse ``inverse`` for
+    numbers from 0 to 0xFFFFFFFF.  :meth:`transform` and :meth:`restore`
+    reject anything else.  The string formats are the same as those of
+    :class:`obscure.Obscure`.
+
+    Args:
+      salt (integer): random 32-bit integer for uniqueness
+    """
+
+    _to_tame = dict(zip(map(ord, "ABCDEFGHIJKLMNOPQRSTUVWXYZ234567"),
+                        _tame_alphabet))
+    _from_tame = dict(zip(map(ord, _tame_alphabet),
+                          "ABCDEFGHIJKLMNOPQRSTUVWXYZ234567"))
+
+    def __init__(self, salt):
+        self.salt = salt & 0xFFFFFFFF
+
+    def forward(self, value):
+        raise NotImplementedError
+
+    def inverse(self, value):
+        raise NotImplementedError
+
+    def transform(self, value):
+        """Obscure a number.
+
+        Raises:
+            ValueError: the number is not from 0 to 0xFFFFFFFF
+        """
+        _check_range(value)
+        return self.forward(value)
+
+    def restore(self, value):
+        """Restore an obscured number.
+
+        Raises:
+            ValueError: the number is not from 0 to 0xFFFFFFFF
+        """
+        _check_range(value)
+        return self.inverse(value)
+
+    def encode_hex(self, value):
+        return "%08x" % self.transform(value)
+
+    def decode_hex(self, value):
+        return self.restore(int(value, 16))
+
+    def encode_base32(self, value):
+        packed = struct.pack(">I", self.transform(value))
+        return base64.b32encode(packed)[:7].decode("ascii")
+
+    def decode_base32(self, value):
+        packed = base64.b32decode(value + "=")
+        return self.restore(struct.unpack(">I", packed)[0])
+
+    def encode_base64(self, value):
+        packed = struct.pack(">I", self.transform(value))
+        return base64.urlsafe_b64encode(packed)[:6].decode("ascii")
+
+    def decode_base64(self, value):
+        packed = base64.urlsafe_b64decode(str(value + "=="))
+        return self.restore(struct.unpack(">I", packed)[0])
+
+    def encode_tame(self, value):
+        return self.encode_base32(value).translate(self._to_tame)
+
+    def decode_tame(self, value):
+        return self.decode_base32(value.translate(self._from_tame))
+
+
+class _Rounds(Permutation):
+    """Three round Feistel network on 16-bit halves.
+
+    Faster and weaker than the cipher of the ``obscure`` module.
+    """
+
+    def __init__(self, salt):
+        Permutation.__init__(self, salt)
+        self.keys = (self.salt >> 16, self.salt & 0xFFFF,
+                     (self.salt >> 8 ^ 0x5A5A) & 0xFFFF)
+
+    @staticmethod
+    def round(half, key):
+        half ^= key
+        return (half * 0x9E3B + (half >> 7)) & 0xFFFF
+
+    def forward(self, value):
+        left, right = value >> 16, value & 0xFFFF
+        for key in self.keys:
+            left, right = right, left ^ self.round(right, key)
+        return left << 16 | right
+
+    def inverse(self, value):
+        left, right = value >> 16, value & 0xFFFF
+        for key in reversed(self.keys):
+            left, right = right ^ self.round(left, key), left
+        return left << 16 | right
+
+
+class _Hash(Permutation):
+    """Salted murmur3 finalizer, an invertible integer hash."""
+
+    def forward(self, value):
+        h = value ^ self.salt
+        h ^= h >> 16
+        h = (h * 0x85EBCA6B) & 0xFFFFFFFF
+        h ^= h >> 13
+        h = (h * 0xC2B2AE35) & 0xFFFFFFFF
+        return h ^ (h >> 16)
+
+    def inverse(self, value):
+        h = value ^ (value >> 16)
+        h = (h * 0x7ED1B41D) & 0xFFFFFFFF
+        h ^= (h >> 13) ^ (h >> 26)
+        h = (h * 0xA5CB9243) & 0xFFFFFFFF
+        return h ^ (h >> 16) ^ self.salt
+
+
+def _table_key(backend, salt):
+    return "backend=%s salt=%d" % (backend, salt)
+
+
+class _Table(Permutation):
+    """Precomputed ``cipher`` for the numbers below ``size``.
+
+    Numbers outside of the table use the ``cipher``, as does
+    :meth:`restore`, since searching the obscured numbers is slower
+    than computing them.  With a ``path`` the table is memory-mapped
+    from that file when its ``header`` matches, so worker processes
+    share one copy.  Otherwise it is built and written there, or kept
+    in memory with a warning when the file cannot be written.
+    """
+
+    typecode = "I" if array("I").itemsize >= 4 else "L"
+
+    def __init__(self, cipher, size, path=None, header=""):
+        self.cipher = cipher
+        self.restore = cipher.restore
+        header = self.header(header, size)
+        self.table = None if path is None else self.load(path, header, size)
+        if self.table is None:
+            self.table = array(self.typecode,
+                               map(cipher.transform, range(size)))
+            if path is not None:
+                try:
+                    self.save(path, header, self.table)
+                except OSError as exc:
+                    warnings.warn("table not saved to %r, kept in memory: %s"
+                                  % (path, exc), RuntimeWarning)
+                else:
+                    self.table = self.load(path, header, size) or self.table
+
+    @classmethod
+    def header(cls, key, size):
+        """File header for a table of ``size`` numbers made with ``key``."""
+        header = ("flask-obscure table %s size=%d %s%d" % (
+            key, size, sys.byteorder, array(cls.typecode).itemsize)
+        ).encode("ascii")
+        # Padded so the numbers after it are aligned when mapped
+        return header + b" " * (7 - len(header) % 8) + b"\n"
+
+    @classmethod
+    def load(cls, path, header, size):
+        """Map the table saved at ``path``, or None if it does not match."""
+        try:
+            with open(path, "rb") as stream:
+                mapped = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):  # missing or empty
+            return None
+        itemsize = array(cls.typecode).itemsize
+        if (len(mapped) != len(header) + size * itemsize
+                or mapped[:len(header)] != header):
+            mapped.close()
+            return None
+        return memoryview(mapped)[len(header):].cast(cls.typecode)
+
+    @staticmethod
+    def save(path, header, table):
+        """Write ``table`` to ``path``, replacing it atomically."""
+        # Other workers may map the file while this one writes it
+        temporary = "%s.%d.tmp" % (path, os.getpid())
+        try:
+            with open(temporary, "wb") as stream:
+                stream.write(header)
+                table.tofile(stream)
+            os.replace(temporary, path)
+        except OSError:
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+            raise
+
+    def transform(self, value):
+        if 0 <= value < len(self.table):
+            return self.table[value]
+        return self.cipher.transform(value)
+
+
+def save_table(path, salt, size, backend="feistel"):
+    """Write an ``OBSCURE_TABLE_FILE`` ahead of time.
+
+    Run this when building or deploying the application, with the
+    ``OBSCURE_SALT``, ``OBSCURE_TABLE_SIZE``, and ``OBSCURE_BACKEND``
+    it will be configured with, so that no worker builds the table at
+    startup.  Also available as
+    ``python -m flask_obscure PATH --salt SALT --size SIZE``.
+
+    Args:
+      path (string): file to write
+      salt (integer): the ``OBSCURE_SALT``
+      size (integer): the ``OBSCURE_TABLE_SIZE``
+      backend (string): the ``OBSCURE_BACKEND``
+
+    Raises:
+        ValueError: unknown backend
+        OSError: the file could not be written
+    """
+    if backend not in backends:
+        raise ValueError("backend must be one of %s, not %r"
+                         % (", ".join(sorted(backends)), backend))
+    header = _Table.header(_table_key(backend, salt), size)
+    _Table.save(path, header, array(_Table.typecode, map(
+        backends[backend](salt).transform, range(size))))
+
+
+backends = {"feistel": _Feistel, "rounds": _Rounds, "hash": _Hash}
+"""Cipher backends by ``OBSCURE_BACKEND`` name.
+
+Each backend is created with the salt and implements ``transform``,
+``restore``, and the ``encode_*`` and ``decode_*`` methods of
+:class:`obscure.Obscure`, see :class:`Permutation`.
+"""
+
+
+class RedisCache(object):
+    """Cache for :class:`Obscure` shared through Redis.
+
+    Wraps a client such as ``redis.Redis``; only its ``get``, ``set``,
+    ``mget``, and ``mset`` methods are used.  :meth:`Obscure.encode_many`
+    fetches a whole batch with one ``mget`` and stores the misses with
+    one ``mset``.  Each single lookup is a network round trip, usually
+    slower than computing the value, so measure with
+    ``tests/benchmark.py cache`` before using it.
+
+    Args:
+      client: Redis client
+      prefix (string): prepended to every key
+    """
+
+    def __init__(self, client, prefix="obscure:"):
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, key):
+        return "%s%s:%s:%s:%s" % ((self.prefix,) + tuple(key))
+
+    @staticmethod
+    def _load(key, stored):
+        stored = stored.decode("ascii") if isinstance(stored, bytes) else stored
+        return int(stored) if key[2] == "transform" else stored
+
+    def __getitem__(self, key):
+        stored = self.client.get(self._key(key))
+        if stored is None:
+            raise KeyError(key)
+        return self._load(key, stored)
+
+    def __setitem__(self, key, value):
+        self.client.set(self._key(key), str(value))
+
+    def get_many(self, keys):
+        """Cached values of ``keys``, None for each miss."""
+        found = self.client.mget([self._key(key) for key in keys])
+        return [None if stored is None else self._load(key, stored)
+                for key, stored in zip(keys, found)]
+
+    def set_many(self, items):
+        """Store ``(key, value)`` pairs."""
+        self.client.mset(dict((self._key(key), str(value))
+                              for key, value in items))
+
+
+def _luhn_weight(index, code):
+    """Luhn contribution of ``code`` at ``index`` of an 8 character ID."""
+    return code if index % 2 else _luhn_double[code]
+
+
+def _luhn_check(tame, codes=_tame_codes):
+    """Code of the check character for a 7 character tame ID."""
+    return -sum(_luhn_weight(idx, codes[char])
+                for idx, char in enumerate(tame)) % 32
+
+
+def _luhn_append(tame):
+    """Append the check character to a 7 character tame ID."""
+    return tame + _tame_alphabet[_luhn_check(tame)]
+
+
+def _luhn_valid(value, codes=_tame_codes):
+    """Whether ``value``, a :class:`str`, or :class:`bytes` with
+    ``codes`` by byte, is a checked tame ID encode_tame can produce."""
+    if len(value) != 8 or any(char not in codes for char in value):
+        return False
+    if codes[value[6]] % 8:
+        return False
+    return _luhn_check(value[:7], codes) == codes[value[7]]
+
+
+# The fixed width formats straight between obscured numbers and bytes,
+# for pack_into and unpack_from: (width, pack, unpack)
+_uint = struct.Struct(">I")
+_tame_bytes = _tame_alphabet.encode("ascii")
+_tame_byte_codes = dict((char, code) for code, char in enumerate(_tame_bytes))
+_to_tame_bytes = bytes.maketrans(b"ABCDEFGHIJKLMNOPQRSTUVWXYZ234567",
+                                 _tame_bytes)
+_from_tame_bytes = bytes.maketrans(_tame_bytes,
+                                   b"ABCDEFGHIJKLMNOPQRSTUVWXYZ234567")
+
+
+def _pack_b32(obscured):
+    return base64.b32encode(_uint.pack(obscured))[:7]
+
+
+def _unpack_b32(data):
+    return _uint.unpack(base64.b32decode(bytes(data) + b"="))[0]
+
+
+def _pack_tame(obscured):
+    return _pack_b32(obscured).translate(_to_tame_bytes)
+
+
+def _unpack_tame(data):
+    return _unpack_b32(bytes(data).translate(_from_tame_bytes))
+
+
+def _pack_tame_check(obscured):
+    tame = _pack_tame(obscured)
+    code = _luhn_check(tame, _tame_byte_codes)
+    return tame + _tame_bytes[code:code + 1]
+
+
+def _unpack_tame_check(data):
+    data = bytes(data)
+    if not _luhn_valid(data, _tame_byte_codes):
+        raise ValueError("invalid checked tame ID %r" % (data,))
+    return _unpack_tame(data[:7])
+
+
+_packed = {
+    "hex": (8, lambda obscured: binascii.hexlify(_uint.pack(obscured)),
+            lambda data: _uint.unpack(binascii.unhexlify(data))[0]),
+    "b32": (7, _pack_b32, _unpack_b32),
+    "b64": (6, lambda obscured: base64.urlsafe_b64encode(
+                _uint.pack(obscured))[:6],
+            lambda data: _uint.unpack(base64.urlsafe_b64decode(
+                bytes(data) + b"=="))[0]),
+    "tame": (7, _pack_tame, _unpack_tame),
+    "tamec": (8, _pack_tame_check, _unpack_tame_check),
+}
+
+
+def _lookup_packed(format):
+    try:
+        return _packed[format]
+    except KeyError:
+        raise ValueError("format must be one of %s, not %r"
+                         % (", ".join(sorted(_packed)), format))
+
+
+def _check_span(buffer, offset, width):
+    if offset < 0 or offset + width > len(buffer):
+        raise ValueError("%d bytes at offset %d do not fit in buffer of %d"
+                         % (width, offset, len(buffer)))
 
 
 class Obscure(_mod_Obscure):
@@ -19,18 +516,62 @@ class Obscure(_mod_Obscure):
     A ``salt`` value is needed.  You can provide it when initializing
     the app or from the flask configuration under the parameter
     ``OBSCURE_SALT``.
+
+    Encoded values can be memoized in an optional ``cache``, any
+    mapping supporting item get and set such as a :class:`dict`.
+    Keys include the salt, so one cache may be shared by several
+    instances.  A cache with ``get_many`` and ``set_many`` methods, like
+    :class:`RedisCache`, is used in batches by :meth:`encode_many`.
+    Without a cache the backend's methods are called directly.
+
+    Setting ``OBSCURE_PROFILE`` in the :class:`flask.Config` records
+    the calls and time spent in the converters for each endpoint, see
+    :meth:`stats`.  ``OBSCURE_PROFILE_URL`` additionally adds a rule
+    serving the statistics as JSON.
+
+    ``OBSCURE_BACKEND`` selects the transformation from
+    :data:`backends`.  The default ``feistel`` is the cipher of the
+    ``obscure`` module; ``rounds`` is a faster three round Feistel
+    network and ``hash`` is a salted, invertible integer hash.
+    With ``OBSCURE_TABLE_SIZE`` set to N, the numbers 0 to N-1 are
+    precomputed when initializing, using about 4 bytes per number,
+    or read from ``OBSCURE_TABLE_FILE`` when it was saved there for
+    the same salt and backend.
+
+    Instances are safe to share between threads without locking.  The
+    backend, salt, and methods bound to them are replaced together by
+    :meth:`init_app`, which should run before serving, and are
+    otherwise immutable.  The
+    ``cache`` only sees single item gets and sets, unless it also has
+    ``get_many`` and ``set_many``, so a :class:`dict` suffices;
+    concurrent misses compute the same value twice.  Profiling keeps
+    the calls of a request in the thread and adds them to the totals
+    once, when the request ends.
     """
 
-    def __init__(self, app=None, salt=None):
+    def __init__(self, app=None, salt=None, cache=None, backend=None):
         """Add converters and filters to a :class:`Flask` instance.
 
+        Without an ``app`` but with a ``salt``, the instance can encode
+        and decode right away without importing Flask or werkzeug.
+
         Args:
           app: a :class:`flask:Flask` instance or None
           salt (integer): random 32-bit integer for uniqueness
+          cache: mapping for memoizing encoded values or None
+          backend (string): name in :data:`backends`, over
+            ``OBSCURE_BACKEND``
         """
         self.salt = salt
+        self._cache = cache
+        self._backend = backend
+        self._totals = {}
+        self._totals_lock = threading.Lock()
+        self._local = threading.local()
         if app is not None:
             self.init_app(app, self.salt)
+        elif salt is not None:
+            self._configure(salt, backend or "feistel")
 
     def init_app(self, app, salt=None):
         """Add converters and filters to a :class:`Flask` instance.
@@ -42,179 +583,709 @@ class Obscure(_mod_Obscure):
         Raises:
             KeyError: ``OBSCURE_SALT`` must be in the
              :class:`flask.Config` if it is not given as a parameter.
+            ValueError: ``OBSCURE_BACKEND`` is not in :data:`backends`
         """
         salt = salt or self.salt or int(app.config["OBSCURE_SALT"])
-        _mod_Obscure.__init__(self, salt)
+        backend = self._backend or app.config.get("OBSCURE_BACKEND", "feistel")
+        self._configure(salt, backend,
+                        int(app.config.get("OBSCURE_TABLE_SIZE", 0)),
+                        app.config.get("OBSCURE_TABLE_FILE"))
+        profile = app.config.get("OBSCURE_PROFILE", False)
 
-        for converter_name, base in converters.items():
+        for converter_name, base in _load_converters().items():
             class_name = "Obscure" + base.__name__
-            class_ = type(class_name, (base,), {"obscure": self})
+            attrs = {"obscure": self}
+            if profile:
+                attrs.update(
+                    (method, self._profiled(converter_name, base, method))
+                    for method in ("to_python", "to_url", "to_url_many")
+                )
+            class_ = type(class_name, (base,), attrs)
             app.url_map.converters[converter_name] = class_
             # Lambda can't use locals so we bind
             # the local variables to input variables.
             filter_ = lambda x, c=class_, s=salt: c(s).to_url(x)
             app.add_template_filter(filter_, converter_name)
 
+        if profile:
+            app.teardown_request(self._collect)
+            url = app.config.get("OBSCURE_PROFILE_URL")
+            if url:
+                app.add_url_rule(url, "obscure_stats", self._stats_view)
 
-class Num(IntegerConverter):
-    """Obscure interger ID with salted value and format as
-    an alternative, non-sequential number.
+    def _configure(self, salt, backend, table_size=0, table_file=None):
+        if backend not in backends:
+            raise ValueError("OBSCURE_BACKEND must be one of %s, not %r"
+                             % (", ".join(sorted(backends)), backend))
+        _mod_Obscure.__init__(self, salt)
+        cipher = backends[backend](salt)
+        if table_size > 0:
+            cipher = _Table(cipher, table_size, table_file,
+                            _table_key(backend, salt))
+        self._bind(_state=(backend, salt, cipher))
 
-    Rule('/customer/<num:customer_id>')
-    """
+    @property
+    def cache(self):
+        """Mapping memoizing encoded values, or None."""
+        return self._cache
 
-    def __init__(self, map):
-        IntegerConverter.__init__(self, map, max=0xFFFFFFFF)
+    @cache.setter
+    def cache(self, cache):
+        self._bind(_cache=cache)
 
-    def to_python(self, value):
-        """Restores original number.
+    def _bind(self, **attrs):
+        """Set ``attrs`` and put the backend's methods on the instance,
+        skipping the class level wrappers unless they are needed for
+        the cache.  The instance dictionary is replaced as a whole, so
+        threads never see a mix of old and new methods."""
+        attrs = dict(self.__dict__, **attrs)
+        state, cache = attrs.get("_state"), attrs.get("_cache")
+        if state is not None:
+            for name in _codec_methods:
+                if cache is not None and name in _cached_methods:
+                    attrs.pop(name, None)
+                else:
+                    attrs[name] = getattr(state[2], name)
+        self.__dict__ = attrs
 
-        Args:
-          value (number string): obscured, non-sequential number
+    def stats(self):
+        """Converter statistics gathered with ``OBSCURE_PROFILE``.
+
+        Calls made outside of a request, or in a request not matching
+        an endpoint, are under the endpoint ``""``.  Include the
+        ``pid`` when aggregating over several worker processes.
 
         Returns:
-            integer: the original number
+          dict: ``{"pid": pid, "endpoints": {endpoint: {"hex.to_url":
+            {"calls": calls, "seconds": seconds}}}}``
+        """
+        endpoints = {}
+        with self._totals_lock:
+            for endpoint, labels in self._totals.items():
+                endpoints[endpoint or ""] = dict(
+                    (label, {"calls": calls, "seconds": seconds})
+                    for label, (calls, seconds) in labels.items())
+        return {"pid": os.getpid(), "endpoints": endpoints}
 
-        See Also:
-            to_url
+    @property
+    def backend(self):
+        """Name of the backend chosen by ``OBSCURE_BACKEND``."""
+        return self._state[0]
+
+    def _profiled(self, converter_name, base, method_name):
+        """Time ``base.method_name`` and record it under the converter."""
+        from flask import has_request_context
+
+        method = getattr(base, method_name)
+        label = "%s.%s" % (converter_name, method_name)
+        local, add = self._local, self._add
+
+        def wrapper(converter, value):
+            start = _timer()
+            try:
+                return method(converter, value)
+            finally:
+                seconds = _timer() - start
+                # The endpoint is unknown while matching, so calls in a
+                # request wait for teardown to be attributed.
+                if has_request_context():
+                    pending = getattr(local, "calls", None)
+                    if pending is None:
+                        pending = local.calls = []
+                    pending.append((label, seconds))
+                else:
+                    add(None, [(label, seconds)])
+
+        wrapper.__name__ = method_name
+        wrapper.__doc__ = method.__doc__
+        return wrapper
+
+    def _collect(self, exc=None):
+        from flask import request
+
+        pending = getattr(self._local, "calls", None)
+        if pending:
+            self._local.calls = []
+            self._add(request.endpoint, pending)
+
+    def _add(self, endpoint, calls):
+        # Once per request, so the lock is not on the converters' path
+        with self._totals_lock:
+            labels = self._totals.setdefault(endpoint, {})
+            for label, seconds in calls:
+                count, total = labels.get(label, (0, 0.0))
+                labels[label] = (count + 1, total + seconds)
+
+    def _stats_view(self):
+        from flask import jsonify
+
+        return jsonify(self.stats())
+
+    transform = _cached("transform")
+    encode_hex = _cached("encode_hex")
+    encode_base32 = _cached("encode_base32")
+    encode_base64 = _cached("encode_base64")
+    encode_tame = _cached("encode_tame")
+    decode_hex = _delegate("decode_hex")
+    decode_base32 = _delegate("decode_base32")
+    decode_base64 = _delegate("decode_base64")
+    decode_tame = _delegate("decode_tame")
+
+    def restore(self, value):
+        """Restore a number obscured with :meth:`transform`.
+
+        Args:
+          value (integer): obscured number
+
+        Returns:
+          integer: the original number
         """
-        value = IntegerConverter.to_python(self, int(value))
-        return self.obscure.transform(value)
+        return self._state[2].restore(value)
 
-    def to_url(self, value):
-        """Convert value to alternate, non-sequential integer format.
+    def encode_tame_check(self, value):
+        """Convert value to tame format with a check character.
+
+        The eighth character is a Luhn mod 32 check over the
+        :meth:`encode_tame` characters, catching any single mistyped
+        character and most swapped neighbors.
 
         Args:
           value (integer): number to obscure
 
         Returns:
-          string: an obscured, non-sequential number
+          string: 8 character tame format
 
         See Also:
-          to_python
+          decode_tame_check, suggest_tame_check
         """
+        return _luhn_append(self.encode_tame(value))
+
+    def decode_tame_check(self, value):
+        """Restore a number from tame format with a check character.
+
+        Args:
+          value (string): 8 character tame format
+
+        Returns:
+          integer: the original number
+
+        Raises:
+            ValueError: the value is malformed or fails the check
         """
-        :param value: integer to convert
-        :returns: integer as a string
+        if not _luhn_valid(value):
+            raise ValueError("invalid checked tame ID %r" % (value,))
+        return self.decode_tame(value[:7])
+
+    def suggest_tame_check(self, value):
+        """Valid corrections of a mistyped checked tame ID.
+
+        Lists the IDs :meth:`encode_tame_check` can produce that differ
+        from ``value`` by one character or by swapping two neighbors.
+        At most one character can be outside of the alphabet.
+
+        Args:
+          value (string): 8 character tame format, case insensitive
+
+        Returns:
+          list: candidate IDs, empty if there are none
         """
-        return str(self.obscure.transform(value))
+        value = value.upper()
+        if len(value) != 8:
+            return []
+        unknown = [idx for idx, char in enumerate(value)
+                   if char not in _tame_codes]
+        if len(unknown) > 1:
+            return []
+        weights = [0 if idx in unknown else
+                   _luhn_weight(idx, _tame_codes[char])
+                   for idx, char in enumerate(value)]
+        total = sum(weights)
+        suggestions = []
+        for idx in unknown or range(8):
+            # Only one character at each position passes the check
+            needed = -(total - weights[idx]) % 32
+            code = needed if idx % 2 else _luhn_halve[needed]
+            suggestion = value[:idx] + _tame_alphabet[code] + value[idx + 1:]
+            if suggestion != value and _luhn_valid(suggestion):
+                suggestions.append(suggestion)
+        if not unknown:
+            for idx in range(7):
+                swapped = (value[:idx] + value[idx + 1] + value[idx]
+                           + value[idx + 2:])
+                if (swapped != value and _luhn_valid(swapped)
+                        and swapped not in suggestions):
+                    suggestions.append(swapped)
+        return suggestions
 
+    def encode_many(self, format, values):
+        """Obscure several numbers at once.
 
-class Hex(BaseConverter):
-    """Obscure numerical ID and format as hex.
+        Args:
+          format (string): a converter name, ``num``, ``hex``, ``b32``,
+            ``b64``, ``tame``, or ``tamec``
+          values: iterable of integers
 
-    Rule('/customer/<hex:customer_id>')
-    """
+        Returns:
+          list: the encoded values in order
+
+        Raises:
+            ValueError: unknown format
+        """
+        if format not in _encoders:
+            raise ValueError("format must be one of %s, not %r"
+                             % (", ".join(sorted(_encoders)), format))
+        if format == "tamec":
+            return [_luhn_append(_) for _ in self.encode_many("tame", values)]
+        name = _encoders[format]
+        cache = self._cache
+        if name in _cached_methods and hasattr(cache, "get_many"):
+            return self._encode_batch(cache, name, values)
+        encode = getattr(self, name)
+        return [encode(value) for value in values]
 
-    weight = 50
-    regex = "[abcdef0123456789]{8}"
+    def _encode_batch(self, cache, name, values):
+        backend, salt, cipher = self._state
+        encode = getattr(cipher, name)
+        keys = [(backend, salt, name, value) for value in values]
+        results = cache.get_many(keys)
+        missing = []
+        for idx, result in enumerate(results):
+            if result is None:
+                results[idx] = encode(keys[idx][3])
+                missing.append((keys[idx], results[idx]))
+        if missing:
+            cache.set_many(missing)
+        return results
 
-    def to_python(self, value):
-        """Restores original number.
+    def encode_cursor(self, value, size=0):
+        """Make a pagination cursor from a position and page size.
 
         Args:
-          value: 8 digit hexadecimal string
+          value (integer): 32-bit position, such as the last ID seen
+          size (integer): page size from 0 to 65535
 
         Returns:
-          integer: original integer
+          string: 8 character url-safe cursor
+
+        Raises:
+            ValueError: the position or page size is out of range
 
         See Also:
-          to_url
+          decode_cursor
         """
+        _check_range(value)
+        if not 0 <= size <= 0xFFFF:
+            raise ValueError("page size must be from 0 to 65535, not %r"
+                             % (size,))
+        packed = _cursor.pack(self.transform(value), size)
+        return base64.urlsafe_b64encode(packed).decode("ascii")
+
+    def decode_cursor(self, cursor):
+        """Restore the position and page size of a pagination cursor.
+
+        Args:
+          cursor (string): 8 character cursor from :meth:`encode_cursor`
+
+        Returns:
+          tuple: the position and page size
+
+        Raises:
+            ValueError: the cursor is malformed
+        """
+        if not _cursor_regex.match(cursor):
+            raise ValueError("malformed cursor %r" % (cursor,))
+        packed = base64.urlsafe_b64decode(str(cursor))
+        obscured, size = _cursor.unpack(packed)
+        return self.restore(obscured), size
+
+    def iter_urls(self, endpoint, key, values, **params):
+        """Build the URLs of an endpoint for many values of one variable.
+
+        This is the same as calling :func:`flask.url_for` for each value,
+        but the obscured converters encode the values in batches and
+        splice them into one built URL.  Useful for sitemaps and URL
+        lists.
+
+        Call within an application context.  The URLs can be consumed
+        after the context ends, such as in a streamed response, unless
+        the variable does not use one of these converters.
+
+        Args:
+          endpoint (string): endpoint given to :func:`flask.url_for`
+          key (string): name of the variable taking the values
+          values: iterable of integers
+          params: other arguments for :func:`flask.url_for`
+
+        Returns:
+          iterator: the URLs in the order of the values
         """
-        :param value: 8 digit hexadecimal format string
-        :returns: integer
+        from flask import current_app, url_for
+
+        def build(value):
+            params[key] = value
+            return url_for(endpoint, **params)
+
+        values = iter(values)
+        first = list(islice(values, 2))
+        urls = [build(value) for value in first]
+        to_url_many = None
+        for rule in current_app.url_map.iter_rules(endpoint):
+            if key in rule.arguments:
+                converter = rule._converters.get(key)
+                to_url_many = getattr(converter, "to_url_many", None)
+                break
+        head = tail = None
+        if to_url_many is not None and urls:
+            encoded = to_url_many(first)
+            head, found, tail = urls[0].rpartition(encoded[0])
+            # Both URLs must match, or the value was found in the wrong place
+            if not found or any(head + part + tail != url
+                                for part, url in zip(encoded, urls)):
+                to_url_many = None
+
+        def generate():
+            for url in urls:
+                yield url
+            if to_url_many is None:
+                for value in values:
+                    yield build(value)
+                return
+            while True:
+                chunk = list(islice(values, 1024))
+                if not chunk:
+                    return
+                for part in to_url_many(chunk):
+                    yield head + part + tail
+
+        return generate()
+
+    def pack_into(self, format, buffer, offset, value):
+        """Write an encoded value into a buffer, like :func:`struct.pack_into`.
+
+        The obscured number is encoded straight to bytes, giving the
+        same characters as the ``encode_*`` methods without building a
+        :class:`str`.
+
+        Args:
+          format (string): one of ``hex``, ``b32``, ``b64``, ``tame``, or
+            ``tamec``
+          buffer: writable buffer such as a :class:`bytearray` or
+            :class:`memoryview`
+          offset (integer): position of the first byte written
+          value (integer): number to obscure
+
+        Raises:
+            ValueError: unknown format or the encoding does not fit
         """
-        return self.obscure.decode_hex(value)
+        width, pack, _ = _lookup_packed(format)
+        _check_span(buffer, offset, width)
+        buffer[offset:offset + width] = pack(self.transform(value))
+
+    def unpack_from(self, format, buffer, offset=0):
+        """Restore a value from a buffer, like :func:`struct.unpack_from`.
 
-    def to_url(self, value):
-        """Convert value to hexadecimal format.
+        Args:
+          format (string): one of ``hex``, ``b32``, ``b64``, ``tame``, or
+            ``tamec``
+          buffer: readable buffer such as :class:`bytes` or
+            :class:`memoryview`
+          offset (integer): position of the first encoded byte
+
+        Returns:
+          integer: the original number
 
-        :param value: integer to convert
-        :returns: string in hexadecimal format
+        Raises:
+            ValueError: unknown format, the buffer is too short, or
+              the value is malformed
         """
-        return self.obscure.encode_hex(value)
+        width, _, unpack = _lookup_packed(format)
+        _check_span(buffer, offset, width)
+        try:
+            obscured = unpack(buffer[offset:offset + width])
+        except struct.error:
+            raise ValueError("malformed %s value at offset %d"
+                             % (format, offset))
+        return self.restore(obscured)
 
 
-class Base32(BaseConverter):
-    """Obscure numerical ID and format as base32.
+def _define_converters():
+    """Create the converter classes, importing werkzeug.
 
-    Rule('/customer/<b32:customer_id>')
+    Returns:
+      dict: ``Num``, ``Hex``, ``Base32``, ``Base64``, ``Tame``,
+        ``TameCheck``, and ``converters`` by name
     """
+    from werkzeug.routing import BaseConverter, IntegerConverter, ValidationError
 
-    weight = 50
-    regex = "[A-Z2-7]{7}"
+    class Bulk(object):
+        """Convert many values to URL parts with one call."""
 
-    def to_python(self, value):
-        """Restores original number.
+        format = None
 
-        :param value: 7 digit base32 format string
-        :returns: integer
+        def to_url_many(self, values):
+            """Convert values like :meth:`to_url`.
+
+            :param values: iterable of integers to convert
+            :returns: list of strings
+            """
+            return self.obscure.encode_many(self.format, values)
+
+    class Num(Bulk, IntegerConverter):
+        """Obscure interger ID with salted value and format as
+        an alternative, non-sequential number.
+
+        Rule('/customer/<num:customer_id>')
         """
 
-        return self.obscure.decode_base32(str(value))
+        def __init__(self, map):
+            IntegerConverter.__init__(self, map, max=0xFFFFFFFF)
+
+        def to_python(self, value):
+            """Restores original number.
+
+            Args:
+              value (number string): obscured, non-sequential number
+
+            Returns:
+                integer: the original number
+
+            See Also:
+                to_url
+            """
+            value = IntegerConverter.to_python(self, int(value))
+            return self.obscure.restore(value)
+
+        def to_url(self, value):
+            """Convert value to alternate, non-sequential integer format.
 
-    def to_url(self, value):
-        """Convert value to Base32 format.
+            Args:
+              value (integer): number to obscure
 
-        :param value: integer to convert
-        :returns: string in Base32 format
+            Returns:
+              string: an obscured, non-sequential number
+
+            See Also:
+              to_python
+            """
+            """
+            :param value: integer to convert
+            :returns: integer as a string
+            """
+            return str(self.obscure.transform(value))
+
+        def to_url_many(self, values):
+            """Convert values like :meth:`to_url`.
+
+            :param values: iterable of integers to convert
+            :returns: list of number strings
+            """
+            return [str(_) for _ in self.obscure.encode_many("num", values)]
+
+    class Hex(Bulk, BaseConverter):
+        """Obscure numerical ID and format as hex.
+
+        Rule('/customer/<hex:customer_id>')
         """
-        return self.obscure.encode_base32(value)
 
+        weight = 50
+        regex = "[abcdef0123456789]{8}"
+        format = "hex"
 
-class Base64(BaseConverter):
-    """Obscure numerical ID and format as url-safe base64.
+        def to_python(self, value):
+            """Restores original number.
 
-    Rule('/customer/<b64:customer_id>')
-    """
+            Args:
+              value: 8 digit hexadecimal string
+
+            Returns:
+              integer: original integer
+
+            See Also:
+              to_url
+            """
+            """
+            :param value: 8 digit hexadecimal format string
+            :returns: integer
+            """
+            return self.obscure.decode_hex(value)
 
-    weight = 50
-    regex = "[-_A-Za-z0-9]{6}"
+        def to_url(self, value):
+            """Convert value to hexadecimal format.
 
-    def to_python(self, value):
-        """Restores original number.
+            :param value: integer to convert
+            :returns: string in hexadecimal format
+            """
+            return self.obscure.encode_hex(value)
 
-        :param value: alternate Base64 format string
-        :returns: integer
+    class Base32(Bulk, BaseConverter):
+        """Obscure numerical ID and format as base32.
+
+        Rule('/customer/<b32:customer_id>')
         """
-        return self.obscure.decode_base64(str(value))
 
-    def to_url(self, value):
-        """Convert value to Base64 format.
+        weight = 50
+        regex = "[A-Z2-7]{7}"
+        format = "b32"
+
+        def to_python(self, value):
+            """Restores original number.
+
+            :param value: 7 digit base32 format string
+            :returns: integer
+            """
+
+            return self.obscure.decode_base32(str(value))
 
-        :param value: integer to convert
-        :returns: string in Base64 format
+        def to_url(self, value):
+            """Convert value to Base32 format.
+
+            :param value: integer to convert
+            :returns: string in Base32 format
+            """
+            return self.obscure.encode_base32(value)
+
+    class Base64(Bulk, BaseConverter):
+        """Obscure numerical ID and format as url-safe base64.
+
+        Rule('/customer/<b64:customer_id>')
         """
-        return self.obscure.encode_base64(value)
 
+        weight = 50
+        regex = "[-_A-Za-z0-9]{6}"
+        format = "b64"
 
-class Tame(BaseConverter):
-    """Obscure numerical ID and format as a custom base32
-    with the vowels 'I', 'O', and 'U' removed to eliminate common
-    offensive words.
+        def to_python(self, value):
+            """Restores original number.
 
-    Rule('/customer/<tame:customer_id>')
-    """
+            :param value: alternate Base64 format string
+            :returns: integer
+            """
+            return self.obscure.decode_base64(str(value))
 
-    weight = 50
-    regex = "[%s]{7}" % _tame_alphabet
+        def to_url(self, value):
+            """Convert value to Base64 format.
 
-    def to_python(self, value):
-        """Restores original number.
+            :param value: integer to convert
+            :returns: string in Base64 format
+            """
+            return self.obscure.encode_base64(value)
 
-        :param value: alternate Base32 format string
-        :returns: integer
+    class Tame(Bulk, BaseConverter):
+        """Obscure numerical ID and format as a custom base32
+        with the vowels 'I', 'O', and 'U' removed to eliminate common
+        offensive words.
+
+        Rule('/customer/<tame:customer_id>')
         """
-        return self.obscure.decode_tame(str(value))
 
-    def to_url(self, value):
-        """Convert value to alternate Base32 format.
+        weight = 50
+        regex = "[%s]{7}" % _tame_alphabet
+        format = "tame"
+
+        def to_python(self, value):
+            """Restores original number.
+
+            :param value: alternate Base32 format string
+            :returns: integer
+            """
+            return self.obscure.decode_tame(str(value))
+
+        def to_url(self, value):
+            """Convert value to alternate Base32 format.
 
-        :param value: integer to convert
-        :returns: alternate Base32 format
+            :param value: integer to convert
+            :returns: alternate Base32 format
+            """
+            return self.obscure.encode_tame(value)
+
+    class TameCheck(Bulk, BaseConverter):
+        """Obscure numerical ID and format as :class:`Tame` followed by
+        a check character to reject mistyped IDs.
+
+        Rule('/customer/<tamec:customer_id>')
         """
-        return self.obscure.encode_tame(value)
 
+        weight = 50
+        regex = "[%s]{8}" % _tame_alphabet
+        format = "tamec"
+
+        def to_python(self, value):
+            """Restores original number.
+
+            :param value: alternate Base32 format string with check
+            :returns: integer
+            """
+            try:
+                return self.obscure.decode_tame_check(str(value))
+            except ValueError:
+                raise ValidationError()
+
+        def to_url(self, value):
+            """Convert value to alternate Base32 format with check.
+
+            :param value: integer to convert
+            :returns: alternate Base32 format with check character
+            """
+            return self.obscure.encode_tame_check(value)
+
+    converters = {
+        "num": Num,
+        "hex": Hex,
+        "tame": Tame,
+        "tamec": TameCheck,
+        "b32": Base32,
+        "b64": Base64,
+    }
+    for class_ in converters.values():
+        class_.__qualname__ = class_.__name__
+    return dict(
+        Num=Num,
+        Hex=Hex,
+        Base32=Base32,
+        Base64=Base64,
+        Tame=Tame,
+        TameCheck=TameCheck,
+        converters=converters,
+    )
+
+
+_lazy_names = (
+    "Num", "Hex", "Base32", "Base64", "Tame", "TameCheck", "converters")
+_lazy_lock = threading.Lock()
+
+
+def _load_converters():
+    """Define the converters on first use and return them."""
+    if "converters" not in globals():
+        with _lazy_lock:
+            if "converters" not in globals():
+                globals().update(_define_converters())
+    return globals()["converters"]
+
+
+def __getattr__(name):
+    # Python 3.7+ only imports werkzeug when the converters are used
+    if name in _lazy_names:
+        _load_converters()
+        return globals()[name]
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_names))
+
+
+if sys.version_info < (3, 7):
+    _load_converters()
+
+
+if __name__ == "__main__":
+    import argparse
 
-converters = {"num": Num, "hex": Hex, "tame": Tame, "b32": Base32, "b64": Base64}
+    parser = argparse.ArgumentParser(description="Write an OBSCURE_TABLE_FILE")
+    parser.add_argument("path")
+    parser.add_argument("--salt", type=lambda _: int(_, 0), required=True)
+    parser.add_argument("--size", type=int, required=True)
+    parser.add_argument("--backend", default="feistel", choices=sorted(backends))
+    args = parser.parse_args()
+    save_table(args.path, args.salt, args.size, args.backend)
@@ -0,0 +1,284 @@
+"""Micro benchmarks for flask_obscure.
+
+    python tests/benchmark.py backends
+    python tests/benchmark.py urls --count 1000000
+
+Each subcommand prints a small table; see ``--help`` for the list.
+Like loadtest.py this is not collected by pytest; run it before and
+after a change to compare.
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from flask import Flask, url_for
+
+import context
+from flask_obscure import Obscure, RedisCache, _Table, backends
+
+SALT = 0x1234
+FORMATS = (
+    ("num", "transform", "restore"),
+    ("hex", "encode_hex", "decode_hex"),
+    ("b32", "encode_base32", "decode_base32"),
+    ("b64", "encode_base64", "decode_base64"),
+    ("tame", "encode_tame", "decode_tame"),
+    ("tamec", "encode_tame_check", "decode_tame_check"),
+)
+
+
+def ops_per_second(func, values, repeat=3):
+    """Best of ``repeat`` runs of ``func`` over all ``values``."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for value in values:
+            func(value)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(values) / best
+
+
+def bench_backends(args):
+    """Encode and decode operations per second for each backend."""
+    values = range(args.count)
+    print("%-8s %-6s %12s %12s" % ("backend", "format", "encode/s", "decode/s"))
+    for backend in sorted(backends):
+        obscure = Obscure(salt=SALT, backend=backend)
+        for name, encoder, decoder in FORMATS:
+            encode = getattr(obscure, encoder)
+            encoded = [encode(_) for _ in values]
+            print("%-8s %-6s %12.0f %12.0f" % (
+                backend, name,
+                ops_per_second(encode, values),
+                ops_per_second(getattr(obscure, decoder), encoded)))
+
+
+def bench_cache(args):
+    """Recompute against cache hits for each format.
+
+    With ``--redis URL`` (needs the redis package) also time single
+    Redis lookups and ``encode_many`` batches of ``--batch`` IDs.
+    """
+    values = range(args.count)
+    caches = [("none", None), ("dict", {})]
+    if args.redis:
+        import redis
+
+        client = redis.Redis.from_url(args.redis)
+        caches.append(("redis", RedisCache(client, prefix="obscure-bench:")))
+    print("%-6s %-6s %12s %12s" % ("cache", "format", "encode/s", "batch/s"))
+    for cache_name, cache in caches:
+        obscure = Obscure(salt=SALT, cache=cache)
+        for name, encoder, _ in FORMATS:
+            encode = getattr(obscure, encoder)
+            for value in values:  # warm the cache
+                encode(value)
+            chunks = [values[_:_ + args.batch]
+                      for _ in range(0, len(values), args.batch)]
+            per_batch = ops_per_second(
+                lambda chunk: obscure.encode_many(name, chunk), chunks)
+            print("%-6s %-6s %12.0f %12.0f" % (
+                cache_name, name, ops_per_second(encode, values),
+                per_batch * args.batch))
+
+
+def bench_threads(args):
+    """Throughput of one shared instance as client threads are added.
+
+    Each thread encodes and decodes its own slice of ``--count`` IDs
+    and checks the round trip.  With the GIL the total should stay
+    flat rather than grow; a drop means the threads contend.
+    """
+    print("%-6s %-8s %12s %10s" % ("cache", "threads", "ops/s", "scaling"))
+    for cache_name, cache in (("none", None), ("dict", {})):
+        obscure = Obscure(salt=SALT, cache=cache)
+        for value in range(args.count):  # warm the cache
+            obscure.decode_tame(obscure.encode_tame(value))
+        base = None
+        for count in (1, 2, 4, 8, 16):
+            chunks = [range(_, args.count, count) for _ in range(count)]
+            errors = []
+
+            def work(values):
+                for value in values:
+                    if obscure.decode_tame(obscure.encode_tame(value)) != value:
+                        errors.append(value)
+
+            threads = [threading.Thread(target=work, args=(_,)) for _ in chunks]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            rate = 2 * args.count / (time.perf_counter() - start)
+            base = base or rate
+            print("%-6s %-8d %12.0f %9.2fx%s" % (
+                cache_name, count, rate, rate / base,
+                "  %d ERRORS" % len(errors) if errors else ""))
+
+
+def bench_buffer(args):
+    """pack_into and unpack_from against slicing the record by hand."""
+    values = range(args.count)
+    obscure = Obscure(salt=SALT)
+    record = bytearray(64)
+    print("%-6s %12s %12s %12s %12s" % (
+        "format", "pack/s", "inline/s", "unpack/s", "inline/s"))
+    for name, encoder, decoder in FORMATS[1:]:
+        encode = getattr(obscure, encoder)
+        decode = getattr(obscure, decoder)
+        width = len(encode(0))
+
+        def pack(value):
+            obscure.pack_into(name, record, 16, value)
+
+        def inline_pack(value):
+            record[16:16 + width] = encode(value).encode("ascii")
+
+        def unpack(value):
+            obscure.unpack_from(name, record, 16)
+
+        def inline_unpack(value):
+            decode(record[16:16 + width].decode("ascii"))
+
+        print("%-6s %12.0f %12.0f %12.0f %12.0f" % (
+            name, ops_per_second(pack, values),
+            ops_per_second(inline_pack, values),
+            ops_per_second(unpack, values),
+            ops_per_second(inline_unpack, values)))
+
+
+def bench_table(args):
+    """Startup cost and lookup speed of OBSCURE_TABLE_SIZE.
+
+    For each of ``--sizes`` reports the build time, the time to read
+    a saved table file, the peak memory of the build, and tame encode
+    and decode speed against the plain backend.  Tracing memory slows
+    the build, so it is timed separately.
+    """
+    print("%-9s %8s %8s %9s %12s %12s %12s" % (
+        "size", "build s", "load s", "peak MB", "plain/s", "encode/s",
+        "decode/s"))
+    cipher = backends[args.backend](SALT)
+    plain = Obscure(salt=SALT, backend=args.backend)
+    values = range(0, args.count)
+    directory = tempfile.mkdtemp()
+    for size in (int(_) for _ in args.sizes.split(",")):
+        path = os.path.join(directory, "table-%d" % size)
+        start = time.perf_counter()
+        _Table(cipher, size, path)
+        built = time.perf_counter() - start
+        start = time.perf_counter()
+        _Table(cipher, size, path)
+        loaded = time.perf_counter() - start
+        os.remove(path)
+        tracemalloc.start()
+        _Table(cipher, size)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        obscure = Obscure(salt=SALT, backend=args.backend)
+        obscure._configure(SALT, args.backend, size)
+        encoded = [obscure.encode_tame(_) for _ in values]
+        print("%-9d %8.2f %8.2f %9.1f %12.0f %12.0f %12.0f" % (
+            size, built, loaded, peak / 2.0 ** 20,
+            ops_per_second(plain.encode_tame, values),
+            ops_per_second(obscure.encode_tame, values),
+            ops_per_second(obscure.decode_tame, encoded)))
+    os.rmdir(directory)
+
+
+def bench_paging(args):
+    """Cursor against OFFSET paging on an in-memory SQLite table.
+
+    Pages per second, fetching ``--batch`` rows at several depths of a
+    ``--count`` row table.  The cursor page includes decoding the
+    request cursor, encoding the IDs, and encoding the next cursor.
+    """
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE customer (id INTEGER PRIMARY KEY, name TEXT)")
+    db.executemany("INSERT INTO customer VALUES (?, ?)",
+                   ((_, "customer %d" % _) for _ in range(1, args.count + 1)))
+    obscure = Obscure(salt=SALT)
+    size = args.batch
+
+    def offset_page(depth):
+        rows = db.execute("SELECT id, name FROM customer ORDER BY id"
+                          " LIMIT ? OFFSET ?", (size, depth)).fetchall()
+        return [obscure.encode_tame(row[0]) for row in rows]
+
+    def cursor_page(cursor):
+        last_id, page = obscure.decode_cursor(cursor)
+        rows = db.execute("SELECT id, name FROM customer WHERE id > ?"
+                          " ORDER BY id LIMIT ?", (last_id, page)).fetchall()
+        ids = obscure.encode_many("tame", [row[0] for row in rows])
+        return ids, obscure.encode_cursor(rows[-1][0], page) if rows else None
+
+    print("%-9s %12s %12s" % ("depth", "offset/s", "cursor/s"))
+    depth = 0
+    while depth < args.count:
+        cursor = obscure.encode_cursor(depth, size)
+        assert cursor_page(cursor)[0] == offset_page(depth)
+        print("%-9d %12.0f %12.0f" % (
+            depth, ops_per_second(offset_page, [depth] * 200),
+            ops_per_second(cursor_page, [cursor] * 200)))
+        depth = depth * 10 or 1000
+
+
+def bench_urls(args):
+    """iter_urls against url_for for ``--count`` IDs per converter.
+
+    Both build external URLs in one application context, as a sitemap
+    would; the results are compared before printing.
+    """
+    app = Flask(__name__)
+    app.config.update(OBSCURE_SALT=SALT, SERVER_NAME="example.com")
+    obscure = Obscure(app)
+    for name, _, _ in FORMATS:
+        app.add_url_rule("/%s/<%s:cust_id>" % (name, name), name,
+                         lambda cust_id: "")
+    values = range(args.count)
+    print("%-6s %12s %12s %8s" % ("conv", "url_for s", "iter_urls s", "ratio"))
+    with app.app_context():
+        for name, _, _ in FORMATS:
+            start = time.perf_counter()
+            expected = [url_for(name, cust_id=_, _external=True) for _ in values]
+            single = time.perf_counter() - start
+            start = time.perf_counter()
+            urls = list(obscure.iter_urls(name, "cust_id", values,
+                                          _external=True))
+            batched = time.perf_counter() - start
+            assert urls == expected
+            print("%-6s %12.2f %12.2f %7.2fx" % (
+                name, single, batched, single / batched))
+
+
+COMMANDS = {"backends": bench_backends, "buffer": bench_buffer,
+            "cache": bench_cache, "paging": bench_paging, "table": bench_table,
+            "urls": bench_urls,
+            "threads": bench_threads}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    parser.add_argument("--count", type=int, default=100000,
+                        help="number of IDs per measurement")
+    parser.add_argument("--batch", type=int, default=100,
+                        help="IDs per encode_many call")
+    parser.add_argument("--redis", help="Redis URL for the cache command")
+    parser.add_argument("--backend", default="feistel", choices=sorted(backends),
+                        help="backend for the table command")
+    parser.add_argument("--sizes", default="65536,262144,1048576",
+                        help="comma separated table sizes")
+    args = parser.parse_args()
+    COMMANDS[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 import itertools
+from flask import Flask, url_for
 
+SALT = 0x1234
 FILTERS = ('my_oct', 'my_hex', 'my_bin')
 METHODS = ('LAMBDA', 'LAMBDA2', 'DEF', 'MIMIC', 'STATIC', 'BUILTIN')
 
@@ -52,3 +54,29 @@ def make_filters(filter_names, method):
         filters = {name: (lambda x, f=Mimic(__builtins__[name[3:]]): f.method(x))
                    for name in filter_names}
     return filters
+
+
+def make_app(backend=None, table_size=None, **config):
+    """Flask app with ``SALT`` and optionally a backend and table size."""
+    app = Flask(__name__)
+    app.config["OBSCURE_SALT"] = SALT
+    if backend is not None:
+        app.config["OBSCURE_BACKEND"] = backend
+    if table_size is not None:
+        app.config["OBSCURE_TABLE_SIZE"] = table_size
+    app.config.update(config)
+    return app
+
+
+def add_index(app, converter):
+    """Route ``/<converter:number>`` to ``index``, echoing the number."""
+    @app.route("/<%s:number>" % converter)
+    def index(number):
+        return str(number)
+
+
+def round_trip(app, value):
+    """Build the ``index`` URL of value and return what the route got."""
+    with app.test_request_context():
+        url = url_for("index", number=value)
+    return app.test_client().get(url).data.decode("ascii")
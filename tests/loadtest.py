@@ -0,0 +1,177 @@
+"""Load test the converters under a threaded WSGI server.
+
+Starts a sample application using every converter in a local
+threaded werkzeug server, then requests a weighted mix of valid,
+malformed, and scanner-style IDs from several client threads and
+reports latency percentiles and requests per second.
+
+Each client thread keeps one HTTP/1.1 connection alive, served by one
+server thread, so the numbers are not dominated by TCP connects and
+thread starts.  ``--reconnect`` opens a new connection per request to
+show that overhead.
+
+    python tests/loadtest.py --threads 8 --seconds 10
+
+This is not collected by pytest; run it before and after changing the
+converters or filters to compare.
+"""
+import argparse
+import random
+import threading
+import time
+from http.client import HTTPConnection
+
+from flask import Flask, render_template_string
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+import context
+from flask_obscure import Obscure, converters
+
+TEMPLATE = "{{ customer_id|%s }}"
+ENCODERS = {
+    "num": "transform",
+    "hex": "encode_hex",
+    "b32": "encode_base32",
+    "b64": "encode_base64",
+    "tame": "encode_tame",
+    "tamec": "encode_tame_check",
+}
+SCANNER_IDS = (
+    "1", "0", "-1", "99999999999999999999", "admin", "..%2F..%2Fetc%2Fpasswd",
+    "1%27%20OR%20%271%27%3D%271", "%00", "A" * 300, "wp-login.php",
+)
+
+
+class KeepAliveHandler(WSGIRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log(self, *args):
+        pass
+
+
+def create_app(salt, rows):
+    app = Flask(__name__)
+    app.config["OBSCURE_SALT"] = salt
+    obscure = Obscure(app)
+
+    for conv in converters:
+        def customer(customer_id, conv=conv):
+            if customer_id >= rows:
+                return "no such customer", 404
+            return render_template_string(TEMPLATE % conv, customer_id=customer_id)
+
+        app.add_url_rule("/%s/<%s:customer_id>" % (conv, conv), conv, customer)
+    return app, obscure
+
+
+def make_paths(obscure, rows, count, weights, seed):
+    """Random request paths tagged valid, malformed, or scanner."""
+    rng = random.Random(seed)
+    names = sorted(converters)
+    kinds = ("valid", "malformed", "scanner")
+    paths = []
+    for _ in range(count):
+        kind = rng.choices(kinds, weights)[0]
+        conv = rng.choice(names)
+        if kind == "valid":
+            value = str(getattr(obscure, ENCODERS[conv])(rng.randrange(rows)))
+        elif kind == "malformed":
+            good = str(getattr(obscure, ENCODERS[conv])(rng.randrange(rows)))
+            value = mangle(rng, good)
+        else:
+            value = rng.choice(SCANNER_IDS)
+        paths.append((kind, "/%s/%s" % (conv, value)))
+    return paths
+
+
+def mangle(rng, value):
+    """Damage an encoded ID the way typos and truncation do."""
+    how = rng.randrange(4)
+    pos = rng.randrange(len(value))
+    if how == 0:
+        return value[:pos]
+    if how == 1:
+        return value + rng.choice("0aZ_")
+    if how == 2:
+        return value[:pos] + rng.choice("!.~IOU") + value[pos + 1:]
+    return value.swapcase()
+
+
+def worker(port, paths, deadline, results, reconnect):
+    conn = HTTPConnection("127.0.0.1", port)
+    for kind, path in paths:
+        if time.perf_counter() > deadline:
+            break
+        start = time.perf_counter()
+        conn.request("GET", path)
+        response = conn.getresponse()
+        response.read()
+        if reconnect:
+            conn.close()
+        results.append((kind, response.status, time.perf_counter() - start))
+    conn.close()
+
+
+def percentile(ordered, fraction):
+    return ordered[int(round(fraction * (len(ordered) - 1)))]
+
+
+def report(results, elapsed):
+    print("%-10s %8s %10s %10s  statuses" % ("kind", "requests", "p50 ms", "p99 ms"))
+    for kind in ("valid", "malformed", "scanner", "all"):
+        rows = [_ for _ in results if kind in (_[0], "all")]
+        if not rows:
+            continue
+        latency = sorted(_[2] * 1000 for _ in rows)
+        statuses = {}
+        for row in rows:
+            statuses[row[1]] = statuses.get(row[1], 0) + 1
+        print("%-10s %8d %10.2f %10.2f  %s" % (
+            kind, len(rows), percentile(latency, 0.5), percentile(latency, 0.99),
+            " ".join("%d:%d" % _ for _ in sorted(statuses.items()))))
+    print("%.1f requests/second over %.1f seconds" % (len(results) / elapsed, elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--requests", type=int, default=20000,
+                        help="maximum requests per thread")
+    parser.add_argument("--mix", default="80:15:5",
+                        help="valid:malformed:scanner weights")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--salt", type=lambda _: int(_, 0), default=0x1234)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reconnect", action="store_true",
+                        help="open a new connection for every request")
+    args = parser.parse_args()
+    weights = [float(_) for _ in args.mix.split(":")]
+
+    app, obscure = create_app(args.salt, args.rows)
+    server = make_server("127.0.0.1", 0, app, threaded=True,
+                         request_handler=KeepAliveHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever).start()
+
+    results = []
+    threads = [
+        threading.Thread(target=worker, args=(
+            server.server_port,
+            make_paths(obscure, args.rows, args.requests, weights, args.seed + idx),
+            time.perf_counter() + args.seconds,
+            results, args.reconnect))
+        for idx in range(args.threads)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+    report(results, elapsed)
+
+
+if __name__ == "__main__":
+    main()
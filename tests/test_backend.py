@@ -0,0 +1,99 @@
+import pytest
+import context
+from obscure import Obscure as ModObscure
+from flask_obscure import Obscure, Permutation, backends, converters
+from helper import SALT, add_index, make_app, round_trip
+ENCODERS = ("encode_hex", "encode_base32", "encode_base64", "encode_tame")
+VALUES = (0, 1, 2, 0x7FE, 0xFFFF, 0x12345678, 0xFFFFFFFF)
+
+
+class ModulePermutation(Permutation):
+    """Feistel cipher of the obscure module in the Permutation formats."""
+
+    def __init__(self, salt):
+        Permutation.__init__(self, salt)
+        self.forward = self.inverse = ModObscure(salt).transform
+
+
+@pytest.mark.parametrize("encoder", ENCODERS)
+def test_permutation_formats_match_module(encoder):
+    module = ModObscure(SALT)
+    permutation = ModulePermutation(SALT)
+    for value in VALUES:
+        assert getattr(module, encoder)(value) == getattr(permutation, encoder)(value)
+
+
+def test_default_backend_is_module():
+    obscure = Obscure(make_app(), SALT)
+    module = ModObscure(SALT)
+    assert obscure.backend == "feistel"
+    for value in VALUES:
+        assert module.transform(value) == obscure.transform(value)
+        assert module.encode_tame(value) == obscure.encode_tame(value)
+
+
+@pytest.mark.parametrize("backend", tuple(backends))
+def test_backend_round_trip(backend):
+    obscure = Obscure(make_app(backend))
+    seen = set()
+    for value in VALUES:
+        obscured = obscure.transform(value)
+        assert 0 <= obscured <= 0xFFFFFFFF
+        assert value == obscure.restore(obscured)
+        assert value == obscure.decode_hex(obscure.encode_hex(value))
+        assert value == obscure.decode_base32(obscure.encode_base32(value))
+        assert value == obscure.decode_base64(obscure.encode_base64(value))
+        assert value == obscure.decode_tame(obscure.encode_tame(value))
+        seen.add(obscured)
+    assert len(seen) == len(VALUES)
+
+
+@pytest.mark.parametrize("converter", tuple(converters))
+def test_hash_backend_routes(converter):
+    app = make_app("hash")
+    obscure = Obscure(app)
+    add_index(app, converter)
+
+    assert round_trip(app, 1234) == "1234"
+    assert obscure.transform(1234) != Obscure(make_app(), SALT).transform(1234)
+
+
+def test_cache_keyed_by_backend():
+    cache = {}
+    feistel = Obscure(make_app(), cache=cache)
+    hashed = Obscure(make_app("hash"), cache=cache)
+    assert feistel.encode_hex(5) != hashed.encode_hex(5)
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        Obscure(make_app("aes"))
+
+
+def test_backend_parameter_over_config():
+    obscure = Obscure(make_app("feistel"), backend="hash")
+    assert obscure.backend == "hash"
+    assert obscure.encode_hex(5) == Obscure(salt=SALT, backend="hash").encode_hex(5)
+
+
+@pytest.mark.parametrize("backend", tuple(backends))
+@pytest.mark.parametrize("value", [-1, 0x100000000, 0x100000002])
+def test_backend_range(backend, value):
+    obscure = Obscure(salt=1, backend=backend)
+    for method in ("transform", "restore", "encode_hex", "encode_base32",
+                   "encode_base64", "encode_tame"):
+        with pytest.raises(ValueError):
+            getattr(obscure, method)(value)
+    with pytest.raises(ValueError):
+        obscure.encode_cursor(value, 10)
+
+
+def test_methods_bound_to_one_backend():
+    obscure = Obscure(make_app("hash"))
+    for backend in ("rounds", "feistel"):
+        old = obscure.__dict__
+        obscure.init_app(make_app(backend))
+        assert obscure.__dict__ is not old
+        cipher = obscure._state[2]
+        for name in ("transform", "restore", "encode_hex", "decode_tame"):
+            assert getattr(obscure, name).__self__ is cipher
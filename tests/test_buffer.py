@@ -0,0 +1,62 @@
+import pytest
+import context
+from flask_obscure import Obscure
+from helper import make_app
+
+FORMATS = {
+    "hex": ("encode_hex", 8),
+    "b32": ("encode_base32", 7),
+    "b64": ("encode_base64", 6),
+    "tame": ("encode_tame", 7),
+    "tamec": ("encode_tame_check", 8),
+}
+
+
+@pytest.mark.parametrize("format", tuple(FORMATS))
+def test_pack_unpack(format):
+    obscure = Obscure(make_app())
+    encoder, width = FORMATS[format]
+    values = range(0, 0x10000, 0x7FE)
+    buffer = bytearray(b"|" * (width * len(values) + 2))
+
+    for idx, value in enumerate(values):
+        obscure.pack_into(format, buffer, 1 + idx * width, value)
+    assert len(buffer) == width * len(values) + 2
+    assert buffer[:1] == buffer[-1:] == b"|"
+
+    view = memoryview(buffer)
+    for idx, value in enumerate(values):
+        offset = 1 + idx * width
+        chunk = bytes(view[offset:offset + width]).decode("ascii")
+        assert chunk == getattr(obscure, encoder)(value)
+        assert value == obscure.unpack_from(format, view, offset)
+        assert value == obscure.unpack_from(format, buffer, offset)
+        assert value == obscure.unpack_from(format, bytes(buffer), offset)
+
+
+@pytest.mark.parametrize("offset", [-1, 3])
+def test_pack_out_of_bounds(offset):
+    obscure = Obscure(make_app())
+    buffer = bytearray(10)
+    with pytest.raises(ValueError):
+        obscure.pack_into("hex", buffer, offset, 1)
+    with pytest.raises(ValueError):
+        obscure.unpack_from("hex", buffer, offset)
+    assert buffer == bytearray(10)
+
+
+def test_unknown_format():
+    obscure = Obscure(make_app())
+    with pytest.raises(ValueError):
+        obscure.pack_into("num", bytearray(10), 0, 1)
+
+
+@pytest.mark.parametrize("format, data", [
+    ("hex", b"0ee21bzz"), ("b32", b"B3RB!GY"), ("b64", b"Du@bmw"),
+    ("tamec", b"D8WD4J5C"), ("tamec", b"D8WD4J5!")])
+def test_unpack_malformed(format, data):
+    obscure = Obscure(make_app())
+    for buffer in (b"--" + data, bytearray(b"--" + data),
+                   memoryview(b"--" + data)):
+        with pytest.raises(ValueError):
+            obscure.unpack_from(format, buffer, 2)
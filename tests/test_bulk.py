@@ -0,0 +1,63 @@
+import pytest
+from flask import url_for
+import context
+from flask_obscure import Obscure, converters
+from helper import make_app
+
+VALUES = list(range(0, 0x10000, 0x7FE)) + [0xFFFFFFFF]
+
+
+@pytest.fixture(scope="function")
+def app():
+    _app = make_app(SERVER_NAME="example.com")
+    Obscure(_app)
+
+    def show(customer_id, **kwargs):
+        return str(customer_id)
+
+    for conv in converters:
+        _app.add_url_rule("/%s/<%s:customer_id>" % (conv, conv), conv, show)
+        _app.add_url_rule(
+            "/%s/<int:page>/<%s:customer_id>" % (conv, conv), conv + "-page", show
+        )
+    _app.add_url_rule("/int/<int:customer_id>", "int", show)
+    return _app
+
+
+@pytest.mark.parametrize("converter", tuple(converters))
+def test_to_url_many(app, converter):
+    conv = app.url_map.converters[converter](app.url_map)
+    assert conv.to_url_many(VALUES) == [conv.to_url(_) for _ in VALUES]
+    assert conv.to_url_many([]) == []
+
+
+@pytest.mark.parametrize("converter", tuple(converters))
+@pytest.mark.parametrize("params", [{}, {"_external": True}, {"q": "x y"}])
+def test_iter_urls(app, converter, params):
+    obscure = app.url_map.converters[converter].obscure
+    with app.app_context():
+        expected = [url_for(converter, customer_id=_, **params) for _ in VALUES]
+        urls = obscure.iter_urls(converter, "customer_id", VALUES, **params)
+    # Consumed outside of the application context
+    assert list(urls) == expected
+
+
+@pytest.mark.parametrize("converter", tuple(converters))
+def test_iter_urls_other_variables(app, converter):
+    obscure = app.url_map.converters[converter].obscure
+    endpoint = converter + "-page"
+    with app.app_context():
+        expected = [url_for(endpoint, customer_id=_, page=3) for _ in VALUES]
+        urls = list(obscure.iter_urls(endpoint, "customer_id", iter(VALUES), page=3))
+    assert urls == expected
+
+
+def test_iter_urls_fallback(app):
+    obscure = app.url_map.converters["hex"].obscure
+    with app.app_context():
+        expected = [url_for("int", customer_id=_) for _ in VALUES]
+        assert list(obscure.iter_urls("int", "customer_id", VALUES)) == expected
+        assert list(obscure.iter_urls("hex", "customer_id", [])) == []
+        assert list(obscure.iter_urls("hex", "customer_id", [5])) == [
+            url_for("hex", customer_id=5)
+        ]
@@ -0,0 +1,128 @@
+import pytest
+from flask import Flask, url_for
+import context
+from flask_obscure import Obscure, RedisCache, converters
+from helper import SALT, add_index, round_trip
+ENCODERS = ("transform", "encode_hex", "encode_base32", "encode_base64", "encode_tame")
+
+
+class CountingCache(dict):
+    """Dictionary counting the values stored."""
+
+    def __init__(self):
+        dict.__init__(self)
+        self.stored = 0
+
+    def __setitem__(self, key, value):
+        self.stored += 1
+        dict.__setitem__(self, key, value)
+
+
+@pytest.mark.parametrize("encoder", ENCODERS)
+def test_cached_matches_uncached(encoder):
+    plain = Obscure(salt=SALT)
+    plain.init_app(Flask(__name__))
+    cached = Obscure(salt=SALT, cache={})
+    cached.init_app(Flask(__name__))
+
+    for value in range(0, 0x10000, 0x7FE):
+        expected = getattr(plain, encoder)(value)
+        assert expected == getattr(cached, encoder)(value)
+        assert expected == getattr(cached, encoder)(value)
+
+
+def test_cache_hit():
+    cache = CountingCache()
+    obscure = Obscure(Flask(__name__), SALT, cache=cache)
+
+    first = obscure.encode_tame(42)
+    stored = cache.stored
+    assert stored > 0
+    assert first == obscure.encode_tame(42)
+    assert cache.stored == stored
+
+
+def test_shared_cache_keyed_by_salt():
+    cache = {}
+    one = Obscure(Flask(__name__), 0x1234, cache=cache)
+    two = Obscure(Flask(__name__), 0x4321, cache=cache)
+
+    assert one.encode_hex(7) != two.encode_hex(7)
+    assert one.encode_hex(7) == Obscure(Flask(__name__), 0x1234).encode_hex(7)
+
+
+@pytest.mark.parametrize("converter", tuple(converters.keys()))
+def test_url_for_uses_cache(converter):
+    cache = CountingCache()
+    app = Flask(__name__)
+    Obscure(app, SALT, cache=cache)
+    add_index(app, converter)
+
+    with app.test_request_context():
+        url = url_for("index", number=9)
+        stored = cache.stored
+        assert url == url_for("index", number=9)
+    assert 0 < stored == cache.stored
+    assert round_trip(app, 9) == "9"
+
+
+def test_cache_set_after_init():
+    obscure = Obscure(Flask(__name__), SALT)
+    expected = obscure.encode_hex(3)
+    cache = obscure.cache = CountingCache()
+    assert obscure.encode_hex(3) == expected
+    assert cache.stored > 0
+    stored = cache.stored
+    obscure.cache = None
+    assert obscure.encode_hex(4) == Obscure(salt=SALT).encode_hex(4)
+    assert cache.stored == stored
+
+
+class FakeRedis(object):
+    """Redis client stand-in storing bytes and counting round trips."""
+
+    def __init__(self):
+        self.data = {}
+        self.calls = []
+
+    def get(self, key):
+        self.calls.append("get")
+        return self.data.get(key)
+
+    def set(self, key, value):
+        self.calls.append("set")
+        self.data[key] = value.encode("ascii")
+
+    def mget(self, keys):
+        self.calls.append("mget")
+        return [self.data.get(key) for key in keys]
+
+    def mset(self, mapping):
+        self.calls.append("mset")
+        self.data.update((k, v.encode("ascii")) for k, v in mapping.items())
+
+
+@pytest.mark.parametrize("format", tuple(converters.keys()))
+def test_redis_cache_batches(format):
+    client = FakeRedis()
+    plain = Obscure(salt=SALT)
+    obscure = Obscure(salt=SALT, cache=RedisCache(client))
+    values = list(range(0, 0x10000, 0x7FE))
+    expected = plain.encode_many(format, values)
+
+    assert obscure.encode_many(format, values) == expected
+    assert client.calls == ["mget", "mset"]
+    del client.calls[:]
+    assert obscure.encode_many(format, values) == expected
+    assert client.calls == ["mget"]
+
+
+def test_redis_cache_single():
+    client = FakeRedis()
+    obscure = Obscure(salt=SALT, cache=RedisCache(client, prefix="t:"))
+    plain = Obscure(salt=SALT)
+    assert obscure.transform(7) == plain.transform(7)
+    assert obscure.transform(7) == plain.transform(7)
+    assert obscure.encode_tame(7) == plain.encode_tame(7)
+    assert client.calls[:3] == ["get", "set", "get"]
+    assert all(key.startswith("t:feistel:") for key in client.data)
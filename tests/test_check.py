@@ -0,0 +1,89 @@
+import pytest
+import context
+from obscure import _base32_custom as ALPHABET
+from flask_obscure import Obscure
+from helper import SALT, add_index, make_app, round_trip
+
+VALUES = (0, 1, 0x7FE, 0xFFFF, 0x12345678, 0xFFFFFFFF)
+
+
+@pytest.fixture(scope="module")
+def obscure():
+    return Obscure(salt=SALT)
+
+
+def test_round_trip(obscure):
+    for value in VALUES:
+        checked = obscure.encode_tame_check(value)
+        assert len(checked) == 8
+        assert checked[:7] == obscure.encode_tame(value)
+        assert obscure.decode_tame_check(checked) == value
+        assert obscure.suggest_tame_check(checked) == []
+
+
+def test_every_substitution_rejected_and_suggested(obscure):
+    for value in VALUES:
+        checked = obscure.encode_tame_check(value)
+        for idx in range(8):
+            for char in ALPHABET.replace(checked[idx], ""):
+                typo = checked[:idx] + char + checked[idx + 1:]
+                with pytest.raises(ValueError):
+                    obscure.decode_tame_check(typo)
+                suggestions = obscure.suggest_tame_check(typo.lower())
+                assert checked in suggestions
+                for suggestion in suggestions:
+                    decoded = obscure.decode_tame_check(suggestion)
+                    assert obscure.encode_tame_check(decoded) == suggestion
+
+
+def test_non_canonical_rejected(obscure):
+    for value in VALUES:
+        checked = obscure.encode_tame_check(value)
+        code = ALPHABET.index(checked[6])
+        for other in range(code + 1, code + 8):
+            # Same decoded number, different unused low bits
+            text = checked[:6] + ALPHABET[other] + checked[7]
+            with pytest.raises(ValueError):
+                obscure.decode_tame_check(text)
+
+
+def test_swapped_neighbors_suggested(obscure):
+    for value in VALUES:
+        checked = obscure.encode_tame_check(value)
+        for idx in range(7):
+            swapped = checked[:idx] + checked[idx + 1] + checked[idx] + checked[idx + 2:]
+            try:
+                obscure.decode_tame_check(swapped)
+            except ValueError:
+                assert checked in obscure.suggest_tame_check(swapped)
+
+
+def test_equal_neighbors_not_suggested(obscure):
+    doubled = [checked for checked in map(obscure.encode_tame_check, range(500))
+               if any(a == b for a, b in zip(checked, checked[1:]))]
+    assert doubled
+    for checked in doubled:
+        assert obscure.suggest_tame_check(checked) == []
+
+
+def test_character_outside_alphabet(obscure):
+    checked = obscure.encode_tame_check(42)
+    typo = checked[:3] + "I" + checked[4:]
+    assert obscure.suggest_tame_check(typo) == [checked]
+    assert obscure.suggest_tame_check("IIU" + checked[3:]) == []
+    assert obscure.suggest_tame_check(checked[:7]) == []
+    with pytest.raises(ValueError):
+        obscure.decode_tame_check(typo)
+    with pytest.raises(ValueError):
+        obscure.decode_tame_check(checked[:7])
+
+
+def test_converter_rejects_typo():
+    app = make_app()
+    obscure = Obscure(app)
+    add_index(app, "tamec")
+
+    assert round_trip(app, 1234) == "1234"
+    url = "/" + obscure.encode_tame_check(1234)
+    typo = url[:-1] + ALPHABET[(ALPHABET.index(url[-1]) + 1) % 32]
+    assert app.test_client().get(typo).status_code == 404
@@ -0,0 +1,67 @@
+import pytest
+import context
+from flask_obscure import Obscure, backends, converters
+from helper import SALT, make_app
+
+VALUES = (0, 1, 0x7FE, 0xFFFF, 0x12345678, 0xFFFFFFFF)
+TRANSLATE = {
+    "num": "transform",
+    "hex": "encode_hex",
+    "b32": "encode_base32",
+    "b64": "encode_base64",
+    "tame": "encode_tame",
+    "tamec": "encode_tame_check",
+}
+
+
+def make_obscure(cache=None):
+    return Obscure(make_app(), cache=cache)
+
+
+@pytest.mark.parametrize("format", tuple(converters))
+@pytest.mark.parametrize("cache", [None, {}])
+def test_encode_many(format, cache):
+    obscure = make_obscure(cache)
+    encode = getattr(obscure, TRANSLATE[format])
+    assert obscure.encode_many(format, VALUES) == [encode(_) for _ in VALUES]
+    assert obscure.encode_many(format, iter([])) == []
+
+
+def test_encode_many_unknown_format():
+    with pytest.raises(ValueError):
+        make_obscure().encode_many("oct", VALUES)
+
+
+@pytest.mark.parametrize("size", [0, 100, 0xFFFF])
+def test_cursor_round_trip(size):
+    obscure = make_obscure()
+    for value in VALUES:
+        cursor = obscure.encode_cursor(value, size)
+        assert len(cursor) == 8
+        assert obscure.decode_cursor(cursor) == (value, size)
+
+
+def test_cursor_is_obscured():
+    obscure = make_obscure()
+    cursors = [obscure.encode_cursor(_, 100) for _ in range(10)]
+    assert len(set(_[:6] for _ in cursors)) == 10
+    assert cursors != sorted(cursors)
+
+
+@pytest.mark.parametrize("size", [-1, 0x10000])
+def test_cursor_bad_size(size):
+    with pytest.raises(ValueError):
+        make_obscure().encode_cursor(1, size)
+
+
+@pytest.mark.parametrize("backend", tuple(backends))
+@pytest.mark.parametrize("value", [-1, 0x100000000, 0x100000005])
+def test_cursor_bad_position(backend, value):
+    with pytest.raises(ValueError):
+        Obscure(salt=SALT, backend=backend).encode_cursor(value, 10)
+
+
+@pytest.mark.parametrize("cursor", ["", "AAAAAAA", "AAAAAAAAA", "AAAA+AAA", "AAAA AAA", "AAAAAAAA\n"])
+def test_cursor_malformed(cursor):
+    with pytest.raises(ValueError):
+        make_obscure().decode_cursor(cursor)
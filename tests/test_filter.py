@@ -14,6 +14,7 @@ TRANSLATE = {
     "b32": "encode_base32",
     "b64": "encode_base64",
     "tame": "encode_tame",
+    "tamec": "encode_tame_check",
 }
 
 
@@ -23,9 +24,16 @@ def B(s):
     return s if sys.version_info.major == 2 else bytes(s, "ascii")
 
 
+def reference(salt, encoder):
+    """Independent encoder, the obscure module unless it lacks the format."""
+    if encoder == "tamec":
+        return obscure.Obscure(salt=salt)
+    return Obscure(salt)
+
+
 def make_jinja_filter_for(encoder):
     enc = TRANSLATE[encoder]
-    return lambda x, s=SALT, f=enc: str(getattr(Obscure(s), f)(x))
+    return lambda x, s=SALT, f=enc: str(getattr(reference(s, encoder), f)(x))
 
 
 @pytest.fixture(scope="function")
@@ -75,7 +83,7 @@ def test_flask_filter(app, encoder):
 
 @pytest.mark.parametrize("encoder", FILTERS)
 def test_jinja2_filter(encoder):
-    obs = Obscure(SALT)
+    obs = reference(SALT, encoder)
 
     def conv(x):
         return str(getattr(obs, TRANSLATE[encoder])(x))
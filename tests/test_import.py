@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+HEAVY = ("flask", "werkzeug", "jinja2")
+
+
+def run_python(*args):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [ROOT, env.get("PYTHONPATH")]))
+    proc = subprocess.Popen((sys.executable,) + args, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = proc.communicate()
+    assert proc.returncode == 0, err
+    return out.decode("utf-8"), err.decode("utf-8")
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason="needs -X importtime")
+def test_import_footprint():
+    _, err = run_python("-X", "importtime", "-c", "import flask_obscure")
+    imported = set(
+        line.split("|")[-1].strip().split(".")[0]
+        for line in err.splitlines() if line.startswith("import time:")
+    )
+    assert "obscure" in imported
+    assert imported.isdisjoint(HEAVY)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason="converters are lazy on 3.7+")
+def test_codec_without_flask():
+    out, _ = run_python("-c", "\n".join((
+        "import sys, flask_obscure",
+        "obscure = flask_obscure.Obscure(salt=0x1234)",
+        "assert obscure.decode_tame(obscure.encode_tame(5)) == 5",
+        "print(' '.join(sorted(sys.modules)))",
+        "print(flask_obscure.converters['hex'].__module__)",
+    )))
+    modules, converter_module = out.split("\n")[:2]
+    assert set(_.split(".")[0] for _ in modules.split()).isdisjoint(HEAVY)
+    assert converter_module == "flask_obscure"
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason="converters are lazy on 3.7+")
+def test_star_import():
+    out, _ = run_python("-c", "\n".join((
+        "import flask_obscure",
+        "assert 'Tame' in dir(flask_obscure)",
+        "from flask_obscure import *",
+        "assert converters['tame'] is Tame",
+        "print(' '.join(sorted(_ for _ in dir() if not _.startswith('_'))))",
+    )))
+    assert out.split() == sorted([
+        "Base32", "Base64", "Hex", "Num", "Obscure", "Permutation",
+        "RedisCache", "Tame", "TameCheck", "backends", "converters",
+        "flask_obscure", "save_table"])
@@ -0,0 +1,62 @@
+import json
+import pytest
+from flask import url_for, request
+import context
+from flask_obscure import Obscure, converters
+from helper import make_app
+
+CONVERTERS = tuple(converters.keys())
+
+
+def profiled_app(**config):
+    app = make_app(**config)
+    obscure = Obscure(app)
+
+    def show(number):
+        return url_for(request.endpoint, number=number)
+
+    for conv in CONVERTERS:
+        app.add_url_rule("/%s/<%s:number>" % (conv, conv), conv, show)
+    return app, obscure
+
+
+@pytest.mark.parametrize("converter", CONVERTERS)
+def test_profile_by_endpoint(converter):
+    app, obscure = profiled_app(OBSCURE_PROFILE=True)
+    with app.test_request_context():
+        url = url_for(converter, number=5)
+
+    # Without ``with`` the client does not push the context again
+    c = app.test_client()
+    for _ in range(3):
+        rv = c.get(url)
+        assert rv.status_code == 200
+        assert rv.data.decode("ascii") == url
+
+    stats = obscure.stats()
+    endpoint = stats["endpoints"][converter]
+    assert endpoint["%s.to_python" % converter]["calls"] == 3
+    assert endpoint["%s.to_url" % converter]["calls"] == 3
+    assert endpoint["%s.to_url" % converter]["seconds"] >= 0
+    # The url_for in test_request_context had no matched endpoint
+    assert stats["endpoints"][""]["%s.to_url" % converter]["calls"] == 1
+
+
+def test_profile_off_by_default():
+    app, obscure = profiled_app()
+    with app.test_request_context():
+        url = url_for("hex", number=5)
+    assert app.test_client().get(url).status_code == 200
+    assert obscure.stats()["endpoints"] == {}
+
+
+def test_profile_url():
+    app, obscure = profiled_app(OBSCURE_PROFILE=True,
+                                OBSCURE_PROFILE_URL="/_obscure")
+    with app.test_request_context():
+        url = url_for("tame", number=5)
+    c = app.test_client()
+    c.get(url)
+    data = json.loads(c.get("/_obscure").data.decode("ascii"))
+    assert data["pid"] == obscure.stats()["pid"]
+    assert data["endpoints"]["tame"]["tame.to_python"]["calls"] == 1
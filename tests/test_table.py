@@ -0,0 +1,93 @@
+import os
+from array import array
+import pytest
+import context
+from flask_obscure import Obscure, _Table, backends, converters, save_table
+from helper import SALT, add_index, make_app, round_trip
+SIZE = 0x400
+VALUES = tuple(range(0, SIZE * 2, 7)) + (0xFFFFFFFF,)
+ENCODERS = ("encode_hex", "encode_base32", "encode_base64", "encode_tame")
+
+
+@pytest.mark.parametrize("backend", tuple(backends))
+def test_table_matches_cipher(backend):
+    computed = Obscure(make_app(backend))
+    table = Obscure(make_app(backend, SIZE))
+    for value in VALUES:
+        obscured = computed.transform(value)
+        assert obscured == table.transform(value)
+        assert value == table.restore(obscured)
+        for encoder in ENCODERS:
+            assert getattr(computed, encoder)(value) == getattr(table, encoder)(value)
+
+
+@pytest.mark.parametrize("converter", tuple(converters))
+def test_table_routes(converter):
+    app = make_app(table_size=SIZE)
+    Obscure(app)
+    add_index(app, converter)
+
+    for value in (0, SIZE - 1, SIZE, SIZE * 3):
+        assert round_trip(app, value) == str(value)
+
+
+def table_of(obscure):
+    return obscure._state[2].table
+
+
+def fail_save(path, header, table):
+    raise AssertionError("table was not loaded from the file")
+
+
+def test_table_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "table")
+    app = make_app(table_size=SIZE, OBSCURE_TABLE_FILE=path)
+    built = Obscure(app)
+    assert SIZE * 4 < os.path.getsize(path) < SIZE * 4 + 80
+    assert isinstance(table_of(built), memoryview)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(_Table, "save", staticmethod(fail_save))
+        loaded = Obscure(app)
+    assert isinstance(table_of(loaded), memoryview)
+    for value in VALUES:
+        assert loaded.encode_tame(value) == built.encode_tame(value)
+        assert loaded.decode_hex(built.encode_hex(value)) == value
+
+    app.config["OBSCURE_SALT"] = SALT + 1
+    other = Obscure(app)
+    assert other.transform(1) != built.transform(1)
+    app.config["OBSCURE_SALT"] = SALT
+    with monkeypatch.context() as patch:
+        patch.setattr(_Table, "save", staticmethod(fail_save))
+        with pytest.raises(AssertionError):
+            Obscure(app)
+
+
+@pytest.mark.parametrize("backend", tuple(backends))
+def test_save_table(tmp_path, monkeypatch, backend):
+    path = str(tmp_path / "table")
+    save_table(path, SALT, SIZE, backend)
+    app = make_app(backend, SIZE, OBSCURE_TABLE_FILE=path)
+    monkeypatch.setattr(_Table, "save", staticmethod(fail_save))
+    obscure = Obscure(app)
+    computed = Obscure(make_app(backend))
+    for value in VALUES:
+        assert obscure.encode_hex(value) == computed.encode_hex(value)
+
+
+def test_save_table_unknown_backend(tmp_path):
+    with pytest.raises(ValueError):
+        save_table(str(tmp_path / "table"), SALT, SIZE, "aes")
+
+
+@pytest.mark.parametrize("name", ["missing/table", "directory"])
+def test_table_file_not_writable(tmp_path, name):
+    (tmp_path / "directory").mkdir()
+    app = make_app(table_size=SIZE,
+                   OBSCURE_TABLE_FILE=str(tmp_path / name))
+    with pytest.warns(RuntimeWarning):
+        obscure = Obscure(app)
+    assert isinstance(table_of(obscure), array)
+    assert obscure.transform(5) == Obscure(make_app()).transform(5)
+    assert sorted(_.name for _ in tmp_path.iterdir()) == ["directory"]
@@ -0,0 +1,81 @@
+import threading
+import pytest
+from flask import url_for
+import context
+from flask_obscure import Obscure, backends
+from helper import add_index, make_app
+
+THREADS = 8
+VALUES = range(0, 0x10000, 0x101)
+
+
+def run_threads(target):
+    errors = []
+
+    def wrapper(idx):
+        try:
+            target(idx)
+        except Exception as exc:  # reported in the main thread
+            errors.append(exc)
+
+    threads = [threading.Thread(target=wrapper, args=(_,)) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+@pytest.mark.parametrize("backend", tuple(backends))
+def test_shared_cache_under_contention(backend):
+    app = make_app(backend)
+    expected = Obscure(app)
+    obscure = Obscure(app, cache={})
+    truth = {value: expected.encode_tame(value) for value in VALUES}
+
+    def work(idx):
+        for value in VALUES:
+            tame = obscure.encode_tame(value)
+            assert tame == truth[value]
+            assert obscure.decode_tame(tame) == value
+
+    run_threads(work)
+
+
+def test_profile_counts_under_contention():
+    app = make_app(OBSCURE_PROFILE=True)
+    obscure = Obscure(app)
+
+    @app.route("/<hex:number>")
+    def index(number):
+        return url_for("index", number=number)
+
+    def work(idx):
+        client = app.test_client()
+        for value in VALUES:
+            url = "/" + obscure.encode_hex(value)
+            assert client.get(url).data.decode("ascii") == url
+
+    run_threads(work)
+    calls = THREADS * len(VALUES)
+    endpoint = obscure.stats()["endpoints"]["index"]
+    assert endpoint["hex.to_python"]["calls"] == calls
+    assert endpoint["hex.to_url"]["calls"] == calls
+
+
+def test_profile_thread_per_request():
+    app = make_app(OBSCURE_PROFILE=True)
+    obscure = Obscure(app)
+    add_index(app, "hex")
+
+    url = "/" + obscure.encode_hex(9)
+    for _ in range(50):
+        threads = [threading.Thread(target=app.test_client().get, args=(url,))
+                   for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert list(obscure._totals) == ["index"]
+    assert obscure.stats()["endpoints"]["index"]["hex.to_python"]["calls"] == 500
@@ -50,6 +50,7 @@ class Generic(object):
             "b32": obs.encode_base32,
             "b64": obs.encode_base64,
             "tame": obs.encode_tame,
+            "tamec": obs.encode_tame_check,
         }
 
     def to_dict(self, obscure=True, endpoint=None):